@@ -4,24 +4,18 @@
 """
 Script pour récupérer et afficher les articles d'une catégorie ou sous-catégorie spécifique depuis MongoDB.
 Ce script est utilisé pour répondre à la partie 8 du TP sur le scraping du Blog du Modérateur.
+Les articles sont lus via le service de lecture (read_api.py), qui doit être démarré.
 """
 
 import sys
-import pymongo
 import json
-from datetime import datetime
 from tabulate import tabulate
 import argparse
-
-# Fonction pour convertir les objets datetime en chaîne
-def json_serial(obj):
-    if isinstance(obj, datetime):
-        return obj.isoformat()
-    raise TypeError(f"Type {type(obj)} non sérialisable")
+from read_api import ReadApiClient
 
 def get_articles_from_db(category, limit=10, output_format="table", sort_by_date=True):
     """
-    Récupère les articles d'une catégorie ou sous-catégorie depuis MongoDB.
+    Récupère les articles d'une catégorie ou sous-catégorie via le service de lecture.
     
     Args:
         category (str): Nom de la catégorie ou sous-catégorie
@@ -33,24 +27,8 @@ def get_articles_from_db(category, limit=10, output_format="table", sort_by_date
         None: Affiche les résultats selon le format spécifié
     """
     try:
-        # Connexion à MongoDB
-        client = pymongo.MongoClient('localhost', 27017)
-        db = client['blogdumoderateur']
-        collection = db['articles']
-        
-        # Création de la requête (recherche insensible à la casse)
-        query = {
-            "$or": [
-                {"subcategory": category},
-                {"subcategory": {"$regex": category, "$options": "i"}}
-            ]
-        }
-        
-        # Définir le tri
-        sort_option = [("publication_date", -1)] if sort_by_date else None
-        
-        # Exécuter la requête
-        articles = list(collection.find(query).sort(sort_option).limit(limit))
+        # Exécuter la requête (recherche insensible à la casse, triée par date si demandé)
+        articles = ReadApiClient().subcategory_articles(category, limit=limit, sort_by_date=sort_by_date)
         
         if not articles:
             print(f"Aucun article trouvé pour la catégorie '{category}'.")
@@ -59,7 +37,7 @@ def get_articles_from_db(category, limit=10, output_format="table", sort_by_date
         # Formater la sortie selon le format demandé
         if output_format == "json":
             # Format JSON complet
-            print(json.dumps(articles, default=json_serial, indent=2, ensure_ascii=False))
+            print(json.dumps(articles, indent=2, ensure_ascii=False))
             
         elif output_format == "compact":
             # Format compact (une ligne par article)
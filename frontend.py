@@ -1,9 +1,11 @@
 import streamlit as st
-import pymongo
 from datetime import datetime, timedelta
 import pandas as pd
 from bson import ObjectId
 import time
+from similar_articles import SimilarArticlesIndex, index_version
+from trends import ALL, load_cube, query_trend, cube_version
+from read_api import ReadApiClient
 
 # Configuration de la page Streamlit
 st.set_page_config(
@@ -12,94 +14,93 @@ st.set_page_config(
     layout="wide"
 )
 
-# Connexion à MongoDB (même configuration que dans scraper.py)
+# Client du service de lecture (partagé par toutes les sessions du dashboard)
 @st.cache_resource
-def get_database_connection():
-    client = pymongo.MongoClient('localhost', 27017)
-    db = client['blogdumoderateur']
-    return db
+def get_api_client():
+    return ReadApiClient()
 
-db = get_database_connection()
-collection = db['articles']
+api = get_api_client()
+
+# Index des articles similaires (rechargé quand le scraper le met à jour)
+@st.cache_resource(max_entries=1)
+def get_similar_index(version):
+    return SimilarArticlesIndex(build=version) if version else None
 
 # Titre et description
 st.title("📰 Explorateur d'articles du Blog du Modérateur")
 st.markdown("Recherchez et explorez les articles scrapés du Blog du Modérateur")
 
-# Fonctions de récupération de données
-@st.cache_data(ttl=300)  # Mise en cache pendant 5 minutes
+# Fonctions de récupération de données (mises en cache par le service de lecture)
 def get_article_stats():
-    total_articles = collection.count_documents({})
-    pipeline = [
-        {"$group": {"_id": "$category", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}}
-    ]
-    categories = list(collection.aggregate(pipeline))
-    
-    pipeline = [
-        {"$unwind": "$tags"},
-        {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 100}  # Limiter aux 100 tags les plus fréquents
-    ]
-    tags = list(collection.aggregate(pipeline))
-    
-    # Obtenir la plage de dates
-    oldest = collection.find_one({}, sort=[("publication_date", 1)])
-    newest = collection.find_one({}, sort=[("publication_date", -1)])
-    
-    oldest_date = oldest.get("publication_date") if oldest else None
-    newest_date = newest.get("publication_date") if newest else None
-    
-    return {
-        "total": total_articles,
-        "categories": categories,
-        "tags": tags,
-        "date_range": (oldest_date, newest_date)
-    }
+    return api.stats()
 
-@st.cache_data
 def search_articles(query=None, category=None, tag=None, start_date=None, end_date=None, limit=50, offset=0):
     """Recherche des articles avec différents filtres"""
-    filters = {}
-    
-    # Filtre par catégorie
-    if category and category != "Toutes":
-        filters["category"] = category
-    
-    # Filtre par tag
-    if tag and tag != "Tous":
-        filters["tags"] = tag
-    
-    # Filtre par date
-    date_filter = {}
-    if start_date:
-        date_filter["$gte"] = start_date
-    if end_date:
-        date_filter["$lte"] = end_date
-    
-    if date_filter:
-        filters["publication_date"] = date_filter
+    return api.search_articles(
+        query=query,
+        category=category,
+        tag=tag,
+        start_date=start_date,
+        end_date=end_date,
+        limit=limit,
+        offset=offset
+    )
+
+def format_categories(article):
+    """Affiche toutes les catégories d'un article (ou la catégorie principale des anciens articles)"""
+    return ", ".join(article.get("categories") or [article.get("category") or ""])
+
+# Cube de tendances et listes de choix (rechargés quand le scraper met le cube à jour)
+@st.cache_resource(max_entries=1)
+def get_trends_cube(version):
+    if not version:
+        return None
+    cube = load_cube()[0]
     
-    # Recherche textuelle
-    if query:
-        filters["$or"] = [
-            {"title": {"$regex": query, "$options": "i"}},
-            {"summary": {"$regex": query, "$options": "i"}},
-            {"content": {"$regex": query, "$options": "i"}},
-            {"tags": {"$regex": query, "$options": "i"}}
-        ]
+    def ranked(dimension):
+        """Valeurs d'une dimension triées par nombre d'articles décroissant"""
+        totals = cube[(cube["category"] == ALL) & (cube["tag"] == ALL)].groupby(dimension, observed=True)["count"].sum()
+        return [value for value in totals.sort_values(ascending=False).index if value != ALL]
     
-    # Exécuter la requête avec pagination
-    cursor = collection.find(
-        filters,
-        {"title": 1, "thumbnail": 1, "category": 1, "favtag": 1, "tags": 1, 
-         "summary": 1, "publication_date": 1, "url": 1, "author": 1}
-    ).sort("publication_date", -1).skip(offset).limit(limit)
+    return {
+        "cube": cube,
+        "categories": ranked("category") or sorted(c for c in cube["category"].cat.categories if c != ALL),
+        "tags": sorted(t for t in cube["tag"].cat.categories if t != ALL),
+        "authors": ranked("author")
+    }
+
+# Choix de la vue
+view = st.sidebar.radio("Vue", ["Articles", "Tendances"])
+
+if view == "Tendances":
+    st.subheader("📈 Tendances hebdomadaires")
+    trends = get_trends_cube(cube_version())
     
-    total = collection.count_documents(filters)
+    if trends is None:
+        st.warning("Le cube de tendances n'est pas encore construit (python trends.py).")
+    else:
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            trend_category = st.selectbox("Catégorie", ["Toutes"] + trends["categories"])
+        with col2:
+            trend_tag = st.selectbox("Tag", ["Tous"] + trends["tags"])
+        with col3:
+            trend_author = st.selectbox("Auteur", ["Tous"] + trends["authors"])
+        
+        series = query_trend(
+            trends["cube"],
+            category=ALL if trend_category == "Toutes" else trend_category,
+            tag=ALL if trend_tag == "Tous" else trend_tag,
+            author=None if trend_author == "Tous" else trend_author
+        )
+        
+        st.metric("Articles sur la période", int(series.sum()))
+        if series.empty:
+            st.info("Aucun article pour cette combinaison.")
+        else:
+            st.line_chart(series.rename("Articles par semaine"))
     
-    return list(cursor), total
+    st.stop()
 
 # Obtenir les statistiques pour les filtres
 stats = get_article_stats()
@@ -191,7 +192,7 @@ else:
         for article in articles:
             df_data.append({
                 "Titre": article.get("title", ""),
-                "Catégorie": article.get("category", ""),
+                "Catégorie": format_categories(article),
                 "Tag principal": article.get("favtag", ""),
                 "Date": article.get("publication_date", ""),
                 "Auteur": article.get("author", ""),
@@ -223,7 +224,7 @@ else:
                     with meta_col1:
                         st.caption(f"📅 {article.get('publication_date', 'Date inconnue')}")
                     with meta_col2:
-                        st.caption(f"📂 {article.get('category', 'Sans catégorie')}")
+                        st.caption(f"📂 {format_categories(article) or 'Sans catégorie'}")
                     with meta_col3:
                         st.caption(f"🔖 {article.get('favtag', 'Sans tag')}")
                     
@@ -238,7 +239,7 @@ else:
                     # Bouton pour voir les détails
                     if st.button(f"Voir détails", key=f"details_{i}"):
                         # Récupérer l'article complet
-                        full_article = collection.find_one({"_id": article["_id"]})
+                        full_article = api.article(article["url"])
                         
                         with st.expander("Contenu complet", expanded=True):
                             st.markdown(f"## {full_article.get('title', 'Sans titre')}")
@@ -248,6 +249,14 @@ else:
                                 st.markdown(full_article["content"].replace("\n", "\n\n"))
                             else:
                                 st.warning("Le contenu complet n'est pas disponible.")
+                            
+                            # Articles similaires, lus dans l'index précalculé
+                            similar_index = get_similar_index(index_version())
+                            similar = similar_index.similar(full_article["url"]) if similar_index else []
+                            if similar:
+                                st.markdown("#### Articles similaires")
+                                for related in similar:
+                                    st.markdown(f"- [{related['title'] or related['url']}]({related['url']})")
             
             # Séparateur entre les articles
             st.markdown("---")
@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Service local de lecture des articles du Blog du Modérateur.
+
+Le service expose la collection MongoDB "articles" en JSON via HTTP, avec un pool
+de connexions partagé et un cache de réponses commun à tous les clients (frontend
+Streamlit, articles_by_category.py). Le cache est invalidé par un compteur de
+version d'écriture que le scraper incrémente à chaque enregistrement, et chaque
+réponse porte un ETag (empreinte du corps) : un client qui renvoie If-None-Match
+reçoit un 304 sans corps tant que la réponse n'a pas changé.
+
+Usage:
+    python read_api.py [--host 127.0.0.1] [--port 8502]
+
+Endpoints (GET):
+    /stats                                          Statistiques globales
+    /articles?query=&category=&tag=&start_date=&end_date=&limit=&offset=
+                                                    Recherche paginée
+    /article?url=                                   Article complet
+    /subcategory?name=&limit=&sort=                 Articles d'une sous-catégorie
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import argparse
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+import requests
+import pymongo
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# Adresse du service utilisée par les clients
+READ_API_URL = os.environ.get('READ_API_URL', 'http://127.0.0.1:8502')
+
+# Connexions MongoDB partagées par les threads du service
+MONGO_POOL_SIZE = 20
+
+# Fréquence maximale de lecture du compteur de version (secondes)
+VERSION_POLL_INTERVAL = 1.0
+
+# Nombre maximum de réponses conservées dans le cache
+CACHE_SIZE = 1024
+
+# Document MongoDB contenant le compteur de version d'écriture
+META_COLLECTION = 'meta'
+WRITE_VERSION_ID = 'write_version'
+
+
+def bump_write_version(db):
+    """Incrémente le compteur de version d'écriture (appelé par le scraper après chaque écriture)"""
+    db[META_COLLECTION].update_one({'_id': WRITE_VERSION_ID}, {'$inc': {'value': 1}}, upsert=True)
+
+
+def json_serial(obj):
+    """Convertit les ObjectId et datetime en chaîne"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Type {type(obj)} non sérialisable")
+
+
+# Requêtes sur la collection
+def get_article_stats(collection):
+    total_articles = collection.count_documents({})
+    pipeline = [
+        # Un article peut apparaître dans plusieurs catégories (anciens articles : champ "category" seul)
+        {"$project": {"categories": {"$ifNull": ["$categories", ["$category"]]}}},
+        {"$unwind": "$categories"},
+        {"$group": {"_id": "$categories", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}}
+    ]
+    categories = list(collection.aggregate(pipeline))
+
+    pipeline = [
+        {"$unwind": "$tags"},
+        {"$group": {"_id": "$tags", "count": {"$sum": 1}}},
+        {"$sort": {"count": -1}},
+        {"$limit": 100}  # Limiter aux 100 tags les plus fréquents
+    ]
+    tags = list(collection.aggregate(pipeline))
+
+    # Obtenir la plage de dates
+    oldest = collection.find_one({}, {"publication_date": 1}, sort=[("publication_date", 1)])
+    newest = collection.find_one({}, {"publication_date": 1}, sort=[("publication_date", -1)])
+
+    oldest_date = oldest.get("publication_date") if oldest else None
+    newest_date = newest.get("publication_date") if newest else None
+
+    return {
+        "total": total_articles,
+        "categories": categories,
+        "tags": tags,
+        "date_range": (oldest_date, newest_date)
+    }
+
+
+def search_articles(collection, query=None, category=None, tag=None, start_date=None, end_date=None, limit=50, offset=0):
+    """Recherche des articles avec différents filtres"""
+    filters = {}
+    conditions = []
+
+    # Filtre par catégorie (toutes les catégories de l'article, ou la catégorie principale des anciens articles)
+    if category and category != "Toutes":
+        conditions.append({"$or": [{"categories": category}, {"category": category}]})
+
+    # Filtre par tag
+    if tag and tag != "Tous":
+        filters["tags"] = tag
+
+    # Filtre par date
+    date_filter = {}
+    if start_date:
+        date_filter["$gte"] = start_date
+    if end_date:
+        date_filter["$lte"] = end_date
+
+    if date_filter:
+        filters["publication_date"] = date_filter
+
+    # Recherche textuelle
+    if query:
+        conditions.append({"$or": [
+            {"title": {"$regex": query, "$options": "i"}},
+            {"summary": {"$regex": query, "$options": "i"}},
+            {"content": {"$regex": query, "$options": "i"}},
+            {"tags": {"$regex": query, "$options": "i"}}
+        ]})
+
+    if conditions:
+        filters["$and"] = conditions
+
+    # Exécuter la requête avec pagination
+    cursor = collection.find(
+        filters,
+        {"title": 1, "thumbnail": 1, "category": 1, "categories": 1, "favtag": 1, "tags": 1,
+         "summary": 1, "publication_date": 1, "url": 1, "author": 1}
+    ).sort("publication_date", -1).skip(offset).limit(limit)
+
+    total = collection.count_documents(filters)
+
+    return {"articles": list(cursor), "total": total}
+
+
+def get_article(collection, url):
+    """Article complet à partir de son URL"""
+    return collection.find_one({"url": url})
+
+
+def get_subcategory_articles(collection, name, limit=10, sort_by_date=True):
+    """Articles d'une catégorie ou sous-catégorie (recherche insensible à la casse)"""
+    query = {
+        "$or": [
+            {"subcategory": name},
+            {"subcategory": {"$regex": name, "$options": "i"}}
+        ]
+    }
+    cursor = collection.find(query)
+    if sort_by_date:
+        cursor = cursor.sort("publication_date", -1)
+    return list(cursor.limit(limit))
+
+
+class ResponseCache:
+    """
+    Cache des réponses JSON, invalidé par le compteur de version d'écriture
+
+    Chaque entrée est associée à la version en cours lors de son calcul : dès que le
+    scraper incrémente le compteur, les entrées des versions précédentes sont ignorées.
+    Une réponse absente n'est calculée que par un thread à la fois, les requêtes
+    identiques arrivées entre-temps attendent son résultat.
+    """
+
+    def __init__(self, db, size=CACHE_SIZE, poll_interval=VERSION_POLL_INTERVAL):
+        self.db = db
+        self.size = size
+        self.poll_interval = poll_interval
+        self.entries = OrderedDict()  # clé -> (version, etag, corps)
+        self.in_flight = {}  # (clé, version) -> Future du calcul en cours
+        self.lock = threading.Lock()
+        self._version = None
+        self._version_checked_at = 0.0
+
+    def version(self):
+        """Version d'écriture courante, relue au plus une fois par poll_interval"""
+        now = time.monotonic()
+        with self.lock:
+            version, checked_at = self._version, self._version_checked_at
+        if version is not None and now - checked_at < self.poll_interval:
+            return version
+
+        # Lecture hors verrou, puis mise à jour conjointe de la version et de sa date
+        doc = self.db[META_COLLECTION].find_one({'_id': WRITE_VERSION_ID})
+        version = doc.get('value', 0) if doc else 0
+        with self.lock:
+            self._version, self._version_checked_at = version, now
+        return version
+
+    def get(self, key, compute):
+        """
+        Retourne (etag, corps) pour une clé, en calculant la réponse si nécessaire
+
+        Args:
+            key (str): Chemin et paramètres de la requête
+            compute (callable): Fonction retournant l'objet à sérialiser
+        """
+        version = self.version()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == version:
+                self.entries.move_to_end(key)
+                return entry[1], entry[2]
+
+            # Un seul calcul par clé et par version, les autres threads attendent son résultat
+            future = self.in_flight.get((key, version))
+            leader = future is None
+            if leader:
+                future = self.in_flight[(key, version)] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            body = json.dumps(compute(), default=json_serial, ensure_ascii=False).encode('utf-8')
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        except BaseException as e:
+            with self.lock:
+                del self.in_flight[(key, version)]
+            future.set_exception(e)
+            raise
+
+        # Entrée enregistrée et calcul retiré ensemble : aucun thread ne peut relancer le calcul entre les deux
+        with self.lock:
+            del self.in_flight[(key, version)]
+            self.entries[key] = (version, etag, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        future.set_result((etag, body))
+        return etag, body
+
+
+class ReadApiHandler(BaseHTTPRequestHandler):
+    """Traitement des requêtes GET du service"""
+
+    # Renseignés par serve()
+    collection = None
+    cache = None
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        params = {name: values[0] for name, values in parse_qs(parsed.query).items()}
+        route = ROUTES.get(parsed.path)
+
+        if route is None:
+            self._send_json(404, {"error": f"Endpoint inconnu: {parsed.path}"})
+            return
+
+        try:
+            key = f"{parsed.path}?{sorted(params.items())}"
+            etag, body = self.cache.get(key, lambda: route(self.collection, params))
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {"error": f"Paramètre invalide: {e}"})
+            return
+        except Exception as e:
+            logger.error(f"Erreur lors du traitement de {self.path}: {e}")
+            self._send_json(500, {"error": str(e)})
+            return
+
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+ROUTES = {
+    '/stats': lambda collection, params: get_article_stats(collection),
+    '/articles': lambda collection, params: search_articles(
+        collection,
+        query=params.get('query'),
+        category=params.get('category'),
+        tag=params.get('tag'),
+        start_date=params.get('start_date'),
+        end_date=params.get('end_date'),
+        limit=int(params.get('limit', 50)),
+        offset=int(params.get('offset', 0))
+    ),
+    '/article': lambda collection, params: get_article(collection, params['url']),
+    '/subcategory': lambda collection, params: get_subcategory_articles(
+        collection,
+        params['name'],
+        limit=int(params.get('limit', 10)),
+        sort_by_date=params.get('sort', '1') == '1'
+    ),
+}
+
+
+def serve(host='127.0.0.1', port=8502):
+    """Démarre le service de lecture"""
+    client = pymongo.MongoClient('localhost', 27017, maxPoolSize=MONGO_POOL_SIZE)
+    db = client['blogdumoderateur']
+
+    ReadApiHandler.collection = db['articles']
+    ReadApiHandler.cache = ResponseCache(db)
+
+    server = ThreadingHTTPServer((host, port), ReadApiHandler)
+    print(f"Service de lecture disponible sur http://{host}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        client.close()
+
+
+class ReadApiClient:
+    """
+    Client du service de lecture
+
+    Les réponses sont conservées localement avec leur ETag : une requête répétée
+    n'est re-téléchargée que si le service signale un changement. Le cache est
+    partagé entre threads, chaque thread utilise sa propre session HTTP.
+    """
+
+    def __init__(self, base_url=READ_API_URL, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.local = threading.local()
+        self.responses = OrderedDict()  # URL complète -> (etag, données)
+        self.lock = threading.Lock()
+
+    @property
+    def session(self):
+        """Session HTTP du thread courant (requests.Session n'est pas garantie thread-safe)"""
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def get(self, path, **params):
+        params = {name: value for name, value in params.items() if value is not None}
+        request = requests.Request('GET', self.base_url + path, params=params).prepare()
+
+        with self.lock:
+            cached = self.responses.get(request.url)
+        headers = {'If-None-Match': cached[0]} if cached else {}
+
+        response = self.session.get(request.url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and cached:
+            return cached[1]
+        response.raise_for_status()
+
+        data = response.json()
+        if response.headers.get('ETag'):
+            with self.lock:
+                self.responses[request.url] = (response.headers['ETag'], data)
+                self.responses.move_to_end(request.url)
+                while len(self.responses) > CACHE_SIZE:
+                    self.responses.popitem(last=False)
+        return data
+
+    def stats(self):
+        return self.get('/stats')
+
+    def search_articles(self, query=None, category=None, tag=None, start_date=None, end_date=None, limit=50, offset=0):
+        data = self.get('/articles', query=query or None, category=category, tag=tag,
+                        start_date=start_date, end_date=end_date, limit=limit, offset=offset)
+        return data['articles'], data['total']
+
+    def article(self, url):
+        return self.get('/article', url=url)
+
+    def subcategory_articles(self, name, limit=10, sort_by_date=True):
+        return self.get('/subcategory', name=name, limit=limit, sort='1' if sort_by_date else '0')
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Service de lecture des articles du Blog du Modérateur')
+    parser.add_argument('--host', default='127.0.0.1', help='Adresse d\'écoute (par défaut: 127.0.0.1)')
+    parser.add_argument('-p', '--port', type=int, default=8502, help='Port d\'écoute (par défaut: 8502)')
+    args = parser.parse_args()
+
+    serve(args.host, args.port)
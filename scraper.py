@@ -1,21 +1,36 @@
 import requests
 from bs4 import BeautifulSoup
-import pymongo
 from datetime import datetime
 import time
 import random
 import logging
 import sys
 import concurrent.futures
+import hashlib
+import argparse
+import threading
+import atexit
+import similar_articles
+import trends
+from storage import MongoSink, SINKS, open_sink
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Configurer la connexion MongoDB
-client = pymongo.MongoClient('localhost', 27017)  # Remplacer par ton adresse MongoDB
-db = client['blogdumoderateur']
-collection = db['articles']
+# Backend de stockage par défaut (MongoDB), connecté à la première utilisation
+_default_sink = None
+_default_sink_lock = threading.Lock()
+
+def get_default_sink():
+    """Retourne le backend MongoDB par défaut (voir storage.py pour les autres backends)"""
+    global _default_sink
+    with _default_sink_lock:
+        if _default_sink is None:
+            _default_sink = MongoSink()  # Remplacer par ton adresse MongoDB: MongoSink(host, port)
+            # Écrire le dernier lot à la fin du programme
+            atexit.register(_default_sink.close)
+        return _default_sink
 
 # Headers pour simuler un navigateur
 headers = {
@@ -34,14 +49,51 @@ PAGE_DELAY = 0.5  # 500ms
 # Nombre maximum de threads pour le scraping parallèle
 MAX_WORKERS = 8
 
+# Nombre maximum d'articles en cours de scraping en mode mémoire bornée
+MAX_IN_FLIGHT = MAX_WORKERS * 4
+
+def _as_list(value):
+    """Normalise une valeur (None, chaîne ou liste) en liste sans doublons"""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(dict.fromkeys(v for v in value if v))
+
 # Fonction pour scraper un article
-def scrape_article(url, category=None, favtag=None, thumbnail_url=None, save_to_db=True):
+def scrape_article(url, category=None, favtag=None, thumbnail_url=None, save_to_db=True, sink=None):
+    """
+    Scrape un article et l'enregistre dans le backend de stockage
+    
+    Args:
+        url (str): URL de l'article
+        category (str | list): Catégorie(s) sous lesquelles l'article est listé
+        favtag (str | list): Favtag(s) relevés dans les listes d'articles
+        thumbnail_url (str): Thumbnail récupéré depuis la liste d'articles
+        save_to_db (bool): Enregistrer le résultat dans le backend de stockage
+        sink (StorageSink): Backend de stockage (MongoDB par défaut, écrit immédiatement ;
+            un backend fourni par l'appelant écrit par lots et doit être vidé avec flush())
+        
+    Returns:
+        dict: Données de l'article, ou None s'il existait déjà ou en cas d'erreur
+    """
+    categories = _as_list(category)
+    favtags = _as_list(favtag)
+    # Sans backend fourni par l'appelant, l'écriture est immédiate (pas de lot en attente)
+    flush_now = save_to_db and sink is None
+    if flush_now:
+        sink = get_default_sink()
+    
     try:
         logger.info(f"Scraping de l'article : {url}")
         
         # Vérifier si l'URL existe déjà dans la base de données - avant même de faire la requête
-        if save_to_db and collection.find_one({"url": url}):
+        if save_to_db and sink.exists(url):
             logger.info(f"L'article existe déjà dans la base de données : {url}")
+            # Ajouter les catégories/favtags éventuellement nouveaux sans re-télécharger l'article
+            sink.merge_labels(url, categories, favtags)
+            if flush_now:
+                sink.flush()
             return None
             
         response = requests.get(url, headers=headers)
@@ -95,16 +147,16 @@ def scrape_article(url, category=None, favtag=None, thumbnail_url=None, save_to_
             else:
                 article_data['thumbnail'] = None
 
-        # 3. La catégorie principale (Web, Marketing, Social, Tech)
-        article_data['category'] = category if category else None
+        # 3. La catégorie principale (Web, Marketing, Social, Tech) et toutes celles où l'article apparaît
+        article_data['category'] = categories[0] if categories else None
+        article_data['categories'] = categories
         
-        # 4. Le favtag principal
-        article_data['favtag'] = favtag if favtag else None
+        # 4. Le favtag principal et tous ceux relevés dans les listes
+        article_data['favtag'] = favtags[0] if favtags else None
+        article_data['favtags'] = favtags
         
         # 5. Récupérer d'autres tags éventuels
-        article_data['tags'] = []
-        if favtag and favtag not in article_data['tags']:
-            article_data['tags'].append(favtag)
+        article_data['tags'] = list(favtags)
             
         # Chercher d'autres tags dans l'article
         tag_elements = soup.find_all('a', class_='post-tag')
@@ -201,22 +253,15 @@ def scrape_article(url, category=None, favtag=None, thumbnail_url=None, save_to_
         else:
             article_data['content'] = None
 
-        # 11. Sauvegarder les données dans MongoDB
+        # 11. Sauvegarder les données (écriture par lots, doublons basés sur l'URL)
         if save_to_db:
             # Ajouter un timestamp pour la date de scraping
             article_data['scraped_at'] = datetime.now()
             
-            # Éviter les doublons basés sur l'URL
-            result = collection.update_one(
-                {"url": url},
-                {"$set": article_data},
-                upsert=True
-            )
-            
-            if result.upserted_id:
-                logger.info(f"Nouvel article '{article_data['title']}' enregistré dans la base MongoDB.")
-            else:
-                logger.info(f"Article '{article_data['title']}' mis à jour dans la base MongoDB.")
+            sink.save(article_data)
+            if flush_now:
+                sink.flush()
+            logger.info(f"Article '{article_data['title']}' enregistré ({sink.name}).")
         
         return article_data
         
@@ -227,28 +272,23 @@ def scrape_article(url, category=None, favtag=None, thumbnail_url=None, save_to_
         logger.error(f"Erreur lors du scraping de {url}: {e}")
         return None
 
-# Fonction pour scraper une catégorie ou sous-catégorie
-def scrape_category(category, max_pages=10):  # Limité à 10 pages pour les tests
+# Fonction pour parcourir les pages de liste d'une catégorie
+def iter_category_links(category, max_pages=10):
     """
-    Scrape tous les articles d'une catégorie ou sous-catégorie avec multithreading
+    Parcourt les pages de liste d'une catégorie et produit les liens d'articles trouvés
     
     Args:
-        category (str): Nom de la catégorie/sous-catégorie à scraper
-        max_pages (int): Limite haute du nombre de pages à scraper
+        category (str): Nom de la catégorie/sous-catégorie à parcourir
+        max_pages (int): Limite haute du nombre de pages à parcourir
         
-    Returns:
-        int: Nombre d'articles scrapés
+    Yields:
+        dict: {'url', 'category', 'favtag', 'thumbnail'} pour chaque article listé
     """
-    scraped_count = 0
     base_url = f"https://www.blogdumoderateur.com/{category}/"
     
     page = 1
     no_articles_count = 0  # Compteur pour les pages sans articles
-    all_article_data = []  # Liste pour stocker les liens et les favtags des articles
     
-    print(f"Récupération des liens d'articles pour la catégorie {category}...")
-    
-    # Première phase : récupérer tous les liens d'articles
     while page <= max_pages:
         try:
             # Pour la première page, utiliser base_url, sinon ajouter page/N/
@@ -313,21 +353,16 @@ def scrape_category(category, max_pages=10):  # Limité à 10 pages pour les tes
                                 thumbnail_url = img.get(attr)
                                 break
                     
-                    # Stocker le lien, le favtag et le thumbnail
                     if article_link:
-                        article_url = article_link
-                        # Vérifier si cet URL est déjà dans notre liste
-                        if not any(item['url'] == article_url for item in all_article_data):
-                            article_info = {
-                                'url': article_url,
-                                'category': category,
-                                'favtag': favtag,
-                                'thumbnail': thumbnail_url
-                            }
-                            all_article_data.append(article_info)
-                            page_links.append(article_url)
+                        page_links.append({
+                            'url': article_link,
+                            'category': category,
+                            'favtag': favtag,
+                            'thumbnail': thumbnail_url
+                        })
                 
                 logger.info(f"Page {page}: {len(page_links)} liens d'articles trouvés")
+                yield from page_links
             
             page += 1
             time.sleep(PAGE_DELAY)  # Pause réduite entre les pages
@@ -339,55 +374,143 @@ def scrape_category(category, max_pages=10):  # Limité à 10 pages pour les tes
             no_articles_count += 1
             time.sleep(PAGE_DELAY)
             continue
+
+def add_to_frontier(frontier, link):
+    """
+    Ajoute un lien d'article à la frontière globale en fusionnant ses métadonnées
+    
+    Args:
+        frontier (dict): Frontière {url: {'url', 'categories', 'favtags', 'thumbnail'}}
+        link (dict): Lien produit par iter_category_links
+        
+    Returns:
+        bool: True si l'URL n'était pas encore dans la frontière
+    """
+    entry = frontier.get(link['url'])
+    is_new = entry is None
+    if is_new:
+        entry = frontier[link['url']] = {
+            'url': link['url'],
+            'categories': [],
+            'favtags': [],
+            'thumbnail': None
+        }
+    
+    if link['category'] and link['category'] not in entry['categories']:
+        entry['categories'].append(link['category'])
+    if link['favtag'] and link['favtag'] not in entry['favtags']:
+        entry['favtags'].append(link['favtag'])
+    if not entry['thumbnail']:
+        entry['thumbnail'] = link['thumbnail']
+    
+    return is_new
+
+def collect_category_links(category, frontier, max_pages=10):
+    """
+    Récupère les liens d'articles d'une catégorie dans la frontière globale
+    
+    Returns:
+        int: Nombre de nouveaux liens ajoutés à la frontière
+    """
+    new_links = 0
+    for link in iter_category_links(category, max_pages):
+        if add_to_frontier(frontier, link):
+            new_links += 1
+    return new_links
+
+def scrape_frontier(frontier, sink=None):
+    """
+    Scrape en parallèle chaque article de la frontière, une seule fois par URL
+    
+    Args:
+        frontier (dict): Frontière construite par collect_category_links
+        sink (StorageSink): Backend de stockage (MongoDB par défaut)
+        
+    Returns:
+        int: Nombre d'articles scrapés
+    """
+    if sink is None:
+        sink = get_default_sink()
+    scraped_count = 0
+    total = len(frontier)
     
-    print(f"Total de {len(all_article_data)} liens d'articles trouvés pour la catégorie {category}")
-    print(f"Début du scraping des articles avec {MAX_WORKERS} threads parallèles...")
+    print(f"Début du scraping de {total} articles avec {MAX_WORKERS} threads parallèles...")
     
-    # Deuxième phase : scraper tous les articles en parallèle
     with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
         # Soumettre tous les liens pour scraping avec leurs catégories, favtags et thumbnails
-        future_to_article = {
+        future_to_url = {
             executor.submit(
-                scrape_article, 
-                article_info['url'], 
-                article_info['category'],
-                article_info['favtag'],
-                article_info.get('thumbnail')  # Passer le thumbnail
-            ): article_info['url'] for article_info in all_article_data
+                scrape_article,
+                entry['url'],
+                entry['categories'],
+                entry['favtags'],
+                entry['thumbnail'],
+                True,
+                sink
+            ): url for url, entry in frontier.items()
         }
         
         # Traiter les résultats au fur et à mesure qu'ils arrivent
-        for i, future in enumerate(concurrent.futures.as_completed(future_to_article)):
-            url = future_to_article[future]
+        for i, future in enumerate(concurrent.futures.as_completed(future_to_url)):
+            url = future_to_url[future]
             try:
                 result = future.result()
                 if result:
                     scraped_count += 1
                 
                 # Afficher la progression
-                if (i+1) % 10 == 0 or i+1 == len(all_article_data):
-                    print(f"Progression: {i+1}/{len(all_article_data)} articles traités ({scraped_count} nouveaux)")
+                if (i+1) % 10 == 0 or i+1 == total:
+                    print(f"Progression: {i+1}/{total} articles traités ({scraped_count} nouveaux)")
                 
             except Exception as e:
                 logger.error(f"Erreur lors du scraping de {url}: {e}")
     
+    # Écrire le dernier lot
+    sink.flush()
+    return scraped_count
+
+# Fonction pour scraper une catégorie ou sous-catégorie
+def scrape_category(category, max_pages=10, sink=None):  # Limité à 10 pages pour les tests
+    """
+    Scrape tous les articles d'une catégorie ou sous-catégorie avec multithreading
+    
+    Args:
+        category (str): Nom de la catégorie/sous-catégorie à scraper
+        max_pages (int): Limite haute du nombre de pages à scraper
+        sink (StorageSink): Backend de stockage (MongoDB par défaut)
+        
+    Returns:
+        int: Nombre d'articles scrapés
+    """
+    frontier = {}
+    
+    print(f"Récupération des liens d'articles pour la catégorie {category}...")
+    collect_category_links(category, frontier, max_pages)
+    print(f"Total de {len(frontier)} liens d'articles trouvés pour la catégorie {category}")
+    
+    scraped_count = scrape_frontier(frontier, sink)
+    
     logger.info(f"Scraping terminé pour la catégorie {category}. {scraped_count} articles scrapés.")
     return scraped_count
 
-def scrape_all_categories():
+def scrape_all_categories(max_pages=10, sink=None):
     """
     Scrape toutes les catégories principales du site
+    
+    Les liens de toutes les catégories sont d'abord fusionnés dans une frontière
+    globale, afin que chaque article ne soit téléchargé qu'une seule fois avec
+    l'ensemble des catégories et favtags sous lesquels il apparaît.
     """
-    total_articles = 0
+    frontier = {}
     
     print("=== DÉBUT DU SCRAPING COMPLET DU BLOG DU MODÉRATEUR ===")
     print(f"Catégories à scraper: {', '.join(CATEGORIES)}")
     
+    # Première phase : construire la frontière globale
     for category in CATEGORIES:
-        print(f"\n>>> Scraping de la catégorie: {category}")
-        category_count = scrape_category(category)
-        total_articles += category_count
-        print(f">>> Terminé: {category_count} articles scrapés dans la catégorie {category}")
+        print(f"\n>>> Récupération des liens de la catégorie: {category}")
+        new_links = collect_category_links(category, frontier, max_pages)
+        print(f">>> Terminé: {new_links} nouveaux liens dans la catégorie {category} ({len(frontier)} au total)")
         
         # Pause plus courte entre les catégories
         if category != CATEGORIES[-1]:
@@ -395,34 +518,163 @@ def scrape_all_categories():
             print(f"Pause de {sleep_time} seconde avant la prochaine catégorie...")
             time.sleep(sleep_time)
     
+    # Deuxième phase : scraper chaque article une seule fois
+    print()
+    total_articles = scrape_frontier(frontier, sink)
+    
     print("\n=== SCRAPING TERMINÉ ===")
-    print(f"Total: {total_articles} articles scrapés et enregistrés dans MongoDB")
+    print(f"Total: {total_articles} articles scrapés et enregistrés")
     
     return total_articles
 
+def _url_key(url):
+    """Empreinte compacte (8 octets) d'une URL pour la détection des doublons"""
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+
+def crawl_bounded(categories=CATEGORIES, max_pages=10, max_in_flight=MAX_IN_FLIGHT, sink=None):
+    """
+    Scrape les catégories en flux continu avec une mémoire bornée
+    
+    Contrairement à scrape_all_categories, les liens ne sont pas accumulés : chaque
+    nouvel article est soumis dès qu'il est découvert, avec au plus max_in_flight
+    articles en cours. Quand la fenêtre est pleine, le parcours des pages de liste
+    attend qu'un article se termine. Les doublons sont détectés via un ensemble
+    d'empreintes de 8 octets, et les catégories/favtags d'un article déjà soumis
+    sont fusionnés dans le backend de stockage plutôt que de le télécharger à nouveau.
+    
+    Args:
+        categories (list): Catégories à parcourir
+        max_pages (int): Limite haute du nombre de pages par catégorie
+        max_in_flight (int): Nombre maximum d'articles soumis et non terminés
+        sink (StorageSink): Backend de stockage (MongoDB par défaut)
+        
+    Returns:
+        int: Nombre d'articles scrapés
+    """
+    if sink is None:
+        sink = get_default_sink()
+    seen = set()  # Empreintes des URLs déjà rencontrées
+    in_flight = {}  # future -> URL
+    pending_labels = {}  # URL en cours -> catégories/favtags découverts entre-temps
+    counters = {'processed': 0, 'scraped': 0}
+    
+    def collect(done):
+        for future in done:
+            url = in_flight.pop(future)
+            labels = pending_labels.pop(url)
+            try:
+                if future.result():
+                    counters['scraped'] += 1
+                # Catégories/favtags rencontrés pendant le scraping de l'article
+                sink.merge_labels(url, labels['categories'], labels['favtags'])
+            except Exception as e:
+                logger.error(f"Erreur lors du scraping de {url}: {e}")
+            
+            counters['processed'] += 1
+            if counters['processed'] % 10 == 0:
+                print(f"Progression: {counters['processed']} articles traités ({counters['scraped']} nouveaux)")
+    
+    print("=== DÉBUT DU SCRAPING EN MÉMOIRE BORNÉE ===")
+    print(f"Catégories à scraper: {', '.join(categories)} ({max_in_flight} articles en cours au maximum)")
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        for category in categories:
+            print(f"\n>>> Scraping de la catégorie: {category}")
+            
+            for link in iter_category_links(category, max_pages):
+                url = link['url']
+                key = _url_key(url)
+                
+                if key in seen:
+                    if url in pending_labels:
+                        labels = pending_labels[url]
+                        if link['category'] not in labels['categories']:
+                            labels['categories'].append(link['category'])
+                        if link['favtag'] and link['favtag'] not in labels['favtags']:
+                            labels['favtags'].append(link['favtag'])
+                    else:
+                        sink.merge_labels(url, _as_list(link['category']), _as_list(link['favtag']))
+                    continue
+                seen.add(key)
+                
+                # Attendre qu'une place se libère dans la fenêtre
+                while len(in_flight) >= max_in_flight:
+                    done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                    collect(done)
+                
+                future = executor.submit(scrape_article, url, link['category'], link['favtag'], link['thumbnail'], True, sink)
+                in_flight[future] = url
+                pending_labels[url] = {'categories': [], 'favtags': []}
+            
+            # Collecter les articles terminés entre deux catégories
+            collect([future for future in list(in_flight) if future.done()])
+        
+        # Attendre les derniers articles
+        collect(list(concurrent.futures.as_completed(list(in_flight))))
+    
+    # Écrire le dernier lot
+    sink.flush()
+    
+    print("\n=== SCRAPING TERMINÉ ===")
+    print(f"Total: {counters['processed']} articles traités, {counters['scraped']} scrapés et enregistrés")
+    
+    return counters['scraped']
+
 # Script principal - pas de choix interactif, on scrape tout
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Scraper les articles du Blog du Modérateur')
+    parser.add_argument('-p', '--max-pages', type=int, default=10,
+                        help='Nombre maximum de pages par catégorie (par défaut: 10)')
+    parser.add_argument('-b', '--bounded', action='store_true',
+                        help='Scraping en flux avec mémoire bornée (recommandé pour un grand nombre de pages)')
+    parser.add_argument('-s', '--sink', choices=list(SINKS), default='mongo',
+                        help='Backend de stockage: mongo, sqlite ou jsonl (par défaut: mongo)')
+    parser.add_argument('-o', '--output', help='Fichier de sortie des backends sqlite/jsonl')
+    args = parser.parse_args()
+    
+    sink = None
     try:
+        sink = open_sink(args.sink, args.output)
+        
         start_time = datetime.now()
         print(f"Début du scraping: {start_time}")
         
-        # Obtenir le nombre d'articles déjà dans la base
-        existing_articles = collection.count_documents({})
+        # Obtenir le nombre d'articles déjà enregistrés
+        existing_articles = sink.count()
         print(f"Nombre d'articles actuellement dans la base: {existing_articles}")
         
         # Lancer le scraping complet
-        total_new = scrape_all_categories()
+        if args.bounded:
+            total_new = crawl_bounded(max_pages=args.max_pages, sink=sink)
+        else:
+            total_new = scrape_all_categories(max_pages=args.max_pages, sink=sink)
+        
+        # Ajouter les nouveaux articles à l'index des articles similaires (construits depuis MongoDB)
+        if total_new and isinstance(sink, MongoSink):
+            try:
+                indexed = similar_articles.update_index(sink.collection)
+                print(f"Index des articles similaires: {indexed} articles ajoutés")
+            except Exception as e:
+                logger.error(f"Erreur lors de la mise à jour de l'index des articles similaires: {e}")
+        
+        # Ajouter au cube de tendances les nouveaux articles et ceux dont les catégories ont changé
+        if isinstance(sink, MongoSink):
+            try:
+                counted = trends.update_cube(sink.collection)
+                print(f"Cube de tendances: {counted} articles ajoutés ou recomptés")
+            except Exception as e:
+                logger.error(f"Erreur lors de la mise à jour du cube de tendances: {e}")
         
         # Afficher les statistiques finales
         end_time = datetime.now()
         duration = end_time - start_time
-        total_articles = collection.count_documents({})
+        total_articles = sink.count()
         
         print("\n=== STATISTIQUES FINALES ===")
         print(f"Durée totale: {duration}")
         print(f"Articles avant: {existing_articles}")
         print(f"Nouveaux articles: {total_new}")
-        print(f"Total articles dans MongoDB: {total_articles}")
+        print(f"Total articles enregistrés ({sink.name}): {total_articles}")
         
     except KeyboardInterrupt:
         print("\nScraping interrompu par l'utilisateur.")
@@ -430,4 +682,8 @@ if __name__ == "__main__":
     except Exception as e:
         logger.error(f"Erreur lors du scraping: {e}")
         print(f"\nUne erreur s'est produite: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
+    finally:
+        # Écrire le dernier lot et fermer le backend
+        if sink is not None:
+            sink.close()
\ No newline at end of file
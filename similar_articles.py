@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Index précalculé des "articles similaires" du Blog du Modérateur.
+
+Chaque article (titre, résumé, contenu, tags) est transformé en vecteur TF-IDF creux
+par hachage des mots, puis ses TOP_K plus proches voisins (similarité cosinus) sont
+calculés par lots vectorisés. Le résultat est enregistré sur disque sous forme de
+tableaux NumPy/SciPy, que le frontend ouvre en mémoire mappée : afficher les articles
+similaires se résume alors à une lecture de ligne, sans aucun calcul à la requête.
+
+Usage:
+    python similar_articles.py            # Mise à jour incrémentale (nouveaux articles)
+    python similar_articles.py --rebuild  # Reconstruction complète de l'index
+"""
+
+import os
+import re
+import json
+import time
+import zlib
+import shutil
+import logging
+import argparse
+import numpy as np
+import scipy.sparse as sp
+import pymongo
+
+logger = logging.getLogger(__name__)
+
+# Dossier de l'index et paramètres de vectorisation
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'similar_index')
+N_FEATURES = 2 ** 18  # Nombre de dimensions du hachage des mots
+TOP_K = 5  # Nombre de voisins conservés par article
+BATCH_SIZE = 256  # Nombre d'articles par lot de calcul de similarité
+FETCH_BATCH_SIZE = 1000  # Nombre d'URLs par requête $in lors des mises à jour
+
+# Poids de chaque champ dans le vecteur d'un article
+FIELD_WEIGHTS = {'title': 3.0, 'tags': 3.0, 'summary': 2.0, 'content': 1.0}
+
+TOKEN_PATTERN = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+
+STOPWORDS = {
+    'les', 'des', 'une', 'est', 'que', 'qui', 'dans', 'pour', 'par', 'sur', 'avec',
+    'son', 'ses', 'leur', 'leurs', 'aux', 'pas', 'plus', 'mais', 'comme', 'ont',
+    'sont', 'été', 'cette', 'ces', 'tout', 'tous', 'elle', 'ils', 'nous', 'vous',
+    'aussi', 'peut', 'entre', 'sans', 'même', 'fait', 'avoir', 'être', 'dont',
+    'encore', 'très', 'lors', 'ainsi', 'selon', 'depuis', 'après', 'avant', 'the', 'and'
+}
+
+# Fichiers de l'index : chaque construction est écrite dans un sous-dossier build-*,
+# et CURRENT_FILE désigne le sous-dossier en service (remplacé atomiquement)
+CURRENT_FILE = 'CURRENT'
+KEEP_BUILDS = 2  # Constructions conservées (l'ancienne peut encore être ouverte par le frontend)
+ARTICLES_FILE = 'articles.json'
+COUNTS_FILE = 'counts.npz'
+DF_FILE = 'df.npy'
+NEIGHBORS_FILE = 'neighbors.npy'
+SCORES_FILE = 'scores.npy'
+META_FILE = 'meta.json'
+
+
+def _feature(token):
+    """Indice de dimension d'un mot (hachage stable d'une exécution à l'autre)"""
+    return zlib.crc32(token.encode('utf-8')) % N_FEATURES
+
+
+def vectorize(articles):
+    """
+    Transforme des articles en matrice creuse de comptes de mots pondérés
+
+    Args:
+        articles (list): Articles contenant title, summary, content et tags
+
+    Returns:
+        scipy.sparse.csr_matrix: Matrice (nombre d'articles x N_FEATURES)
+    """
+    rows, cols, data = [], [], []
+
+    for row, article in enumerate(articles):
+        for field, weight in FIELD_WEIGHTS.items():
+            value = article.get(field)
+            if not value:
+                continue
+            text = ' '.join(value) if isinstance(value, list) else value
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                if token not in STOPWORDS:
+                    rows.append(row)
+                    cols.append(_feature(token))
+                    data.append(weight)
+
+    counts = sp.coo_matrix(
+        (np.asarray(data, dtype=np.float32), (np.asarray(rows, dtype=np.int32), np.asarray(cols, dtype=np.int32))),
+        shape=(len(articles), N_FEATURES)
+    ).tocsr()
+    counts.sum_duplicates()
+    return counts
+
+
+def document_frequencies(counts):
+    """Nombre d'articles contenant chaque dimension"""
+    return np.bincount(counts.indices, minlength=N_FEATURES).astype(np.int32)
+
+
+def tfidf(counts, df):
+    """Pondération TF-IDF (tf logarithmique) et normalisation L2 des lignes"""
+    n_docs = counts.shape[0]
+    idf = (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+
+    weighted = counts.copy()
+    weighted.data = np.log1p(weighted.data)
+    weighted = weighted.multiply(idf).tocsr()
+
+    norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.diags(1.0 / norms).dot(weighted).tocsr().astype(np.float32)
+
+
+def top_k_neighbors(queries, candidates, k=TOP_K, self_offset=None):
+    """
+    Calcule les k plus proches voisins de chaque ligne de queries parmi candidates
+
+    Args:
+        queries (csr_matrix): Vecteurs normalisés des articles à traiter
+        candidates (csr_matrix): Vecteurs normalisés des voisins possibles
+        k (int): Nombre de voisins à conserver
+        self_offset (int): Si queries fait partie de candidates, indice de sa première ligne
+            (pour exclure chaque article de ses propres voisins)
+
+    Returns:
+        tuple: (indices int32, scores float32), tableaux de forme (lignes de queries x k)
+    """
+    n_queries = queries.shape[0]
+    neighbors = np.full((n_queries, k), -1, dtype=np.int32)
+    scores = np.full((n_queries, k), -np.inf, dtype=np.float32)
+    k_eff = min(k, candidates.shape[0])
+    if k_eff == 0:
+        return neighbors, scores
+
+    candidates_t = candidates.T.tocsc()
+    for start in range(0, n_queries, BATCH_SIZE):
+        stop = min(start + BATCH_SIZE, n_queries)
+        sims = queries[start:stop].dot(candidates_t).toarray()
+
+        if self_offset is not None:
+            batch_rows = np.arange(stop - start)
+            sims[batch_rows, self_offset + start + batch_rows] = -np.inf
+
+        # Sélection partielle des k meilleurs, puis tri de ces k seulement
+        top = np.argpartition(-sims, k_eff - 1, axis=1)[:, :k_eff]
+        top_scores = np.take_along_axis(sims, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        neighbors[start:stop, :k_eff] = np.take_along_axis(top, order, axis=1)
+        scores[start:stop, :k_eff] = np.take_along_axis(top_scores, order, axis=1)
+
+    return neighbors, scores
+
+
+def merge_neighbors(neighbors_a, scores_a, neighbors_b, scores_b, k=TOP_K):
+    """Fusionne deux listes de voisins et conserve les k meilleurs scores"""
+    neighbors = np.concatenate([neighbors_a, neighbors_b], axis=1)
+    scores = np.concatenate([scores_a, scores_b], axis=1)
+    order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+    return np.take_along_axis(neighbors, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def _fetch_articles(collection, query=None):
+    """Récupère les champs utiles à l'index, triés par date de scraping"""
+    projection = {'_id': 0, 'url': 1, 'title': 1, 'summary': 1, 'content': 1, 'tags': 1, 'scraped_at': 1}
+    return list(collection.find(query or {}, projection).sort('scraped_at', 1))
+
+
+def _fetch_new_articles(collection, known_urls):
+    """
+    Récupère les articles dont l'URL n'est pas encore indexée
+
+    La sélection se fait sur les URLs et non sur la date de scraping, pour inclure
+    les articles chargés après coup avec une date plus ancienne (storage.py load).
+    """
+    new_urls = [doc['url'] for doc in collection.find({}, {'_id': 0, 'url': 1}) if doc['url'] not in known_urls]
+    docs = []
+    for start in range(0, len(new_urls), FETCH_BATCH_SIZE):
+        docs.extend(_fetch_articles(collection, {'url': {'$in': new_urls[start:start + FETCH_BATCH_SIZE]}}))
+    return docs
+
+
+def current_build(index_dir=INDEX_DIR):
+    """Nom du sous-dossier de l'index en service (None si l'index n'existe pas)"""
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), encoding='utf-8') as f:
+            build = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return build if build and os.path.isdir(os.path.join(index_dir, build)) else None
+
+
+def _save(index_dir, articles, counts, df, neighbors, scores, meta):
+    """
+    Écrit l'index dans un nouveau sous-dossier puis le met en service
+
+    Le pointeur CURRENT est remplacé atomiquement une fois tous les fichiers écrits :
+    un lecteur voit toujours une construction complète et cohérente.
+    """
+    build = f"build-{time.time_ns()}"
+    build_dir = os.path.join(index_dir, build)
+    os.makedirs(build_dir)
+
+    def path(name):
+        return os.path.join(build_dir, name)
+
+    with open(path(ARTICLES_FILE), 'w', encoding='utf-8') as f:
+        json.dump(articles, f, ensure_ascii=False)
+    sp.save_npz(path(COUNTS_FILE), counts)
+    for name, array in ((DF_FILE, df), (NEIGHBORS_FILE, neighbors), (SCORES_FILE, scores)):
+        with open(path(name), 'wb') as f:
+            np.save(f, array)
+    with open(path(META_FILE), 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+
+    pointer = os.path.join(index_dir, CURRENT_FILE)
+    with open(pointer + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(build)
+    os.replace(pointer + '.tmp', pointer)
+
+    # Supprimer les constructions plus anciennes
+    builds = sorted(name for name in os.listdir(index_dir) if name.startswith('build-'))
+    for old_build in builds[:-KEEP_BUILDS]:
+        shutil.rmtree(os.path.join(index_dir, old_build), ignore_errors=True)
+
+
+def _meta():
+    """Métadonnées de l'index : paramètres de vectorisation"""
+    return {'n_features': N_FEATURES, 'top_k': TOP_K}
+
+
+def build_index(collection, index_dir=INDEX_DIR):
+    """
+    Construit l'index complet à partir de tous les articles de la collection
+
+    Returns:
+        int: Nombre d'articles indexés
+    """
+    docs = _fetch_articles(collection)
+    counts = vectorize(docs)
+    df = document_frequencies(counts)
+    vectors = tfidf(counts, df)
+    neighbors, scores = top_k_neighbors(vectors, vectors, self_offset=0)
+
+    articles = [{'url': doc['url'], 'title': doc.get('title')} for doc in docs]
+    _save(index_dir, articles, counts, df, neighbors, scores, _meta())
+    logger.info(f"Index des articles similaires construit: {len(articles)} articles")
+    return len(articles)
+
+
+def update_index(collection, index_dir=INDEX_DIR):
+    """
+    Ajoute à l'index les articles de la collection qui n'y sont pas encore
+
+    Les voisins des nouveaux articles sont calculés parmi tout l'index, et ceux des
+    articles existants ne sont mis à jour que si un nouvel article fait mieux que
+    leurs voisins actuels. Les scores existants gardent l'IDF de leur calcul :
+    une reconstruction complète (--rebuild) les réaligne.
+
+    Returns:
+        int: Nombre d'articles ajoutés à l'index
+    """
+    build = current_build(index_dir)
+    if build is None:
+        return build_index(collection, index_dir)
+    build_dir = os.path.join(index_dir, build)
+
+    with open(os.path.join(build_dir, META_FILE), encoding='utf-8') as f:
+        meta = json.load(f)
+    if meta.get('n_features') != N_FEATURES or meta.get('top_k') != TOP_K:
+        logger.info("Paramètres de l'index modifiés, reconstruction complète")
+        return build_index(collection, index_dir)
+
+    with open(os.path.join(build_dir, ARTICLES_FILE), encoding='utf-8') as f:
+        articles = json.load(f)
+    known_urls = {article['url'] for article in articles}
+
+    new_docs = _fetch_new_articles(collection, known_urls)
+    if not new_docs:
+        return 0
+
+    n_old = len(articles)
+    old_counts = sp.load_npz(os.path.join(build_dir, COUNTS_FILE)).tocsr()
+    new_counts = vectorize(new_docs)
+    df = np.load(os.path.join(build_dir, DF_FILE)) + document_frequencies(new_counts)
+    counts = sp.vstack([old_counts, new_counts]).tocsr()
+    vectors = tfidf(counts, df)
+
+    # Voisins des nouveaux articles parmi tout l'index
+    new_neighbors, new_scores = top_k_neighbors(vectors[n_old:], vectors, self_offset=n_old)
+
+    # Les nouveaux articles peuvent devenir voisins des anciens
+    old_neighbors = np.load(os.path.join(build_dir, NEIGHBORS_FILE))
+    old_scores = np.load(os.path.join(build_dir, SCORES_FILE))
+    candidates, candidate_scores = top_k_neighbors(vectors[:n_old], vectors[n_old:])
+    candidates[candidates >= 0] += n_old
+    old_neighbors, old_scores = merge_neighbors(old_neighbors, old_scores, candidates, candidate_scores)
+
+    articles.extend({'url': doc['url'], 'title': doc.get('title')} for doc in new_docs)
+    _save(
+        index_dir, articles, counts, df,
+        np.vstack([old_neighbors, new_neighbors]), np.vstack([old_scores, new_scores]),
+        _meta()
+    )
+    logger.info(f"Index des articles similaires mis à jour: {len(new_docs)} nouveaux articles")
+    return len(new_docs)
+
+
+class SimilarArticlesIndex:
+    """Lecture de l'index en mémoire mappée, pour le frontend"""
+
+    def __init__(self, index_dir=INDEX_DIR, build=None):
+        build_dir = os.path.join(index_dir, build or current_build(index_dir))
+        with open(os.path.join(build_dir, ARTICLES_FILE), encoding='utf-8') as f:
+            self.articles = json.load(f)
+        self.row_by_url = {article['url']: row for row, article in enumerate(self.articles)}
+        self.neighbors = np.load(os.path.join(build_dir, NEIGHBORS_FILE), mmap_mode='r')
+        self.scores = np.load(os.path.join(build_dir, SCORES_FILE), mmap_mode='r')
+
+    def similar(self, url, k=TOP_K):
+        """
+        Retourne les articles les plus similaires à une URL
+
+        Returns:
+            list: [{'url', 'title', 'score'}], vide si l'article n'est pas indexé
+        """
+        row = self.row_by_url.get(url)
+        if row is None or row >= len(self.neighbors):
+            return []
+
+        results = []
+        for neighbor, score in zip(self.neighbors[row, :k], self.scores[row, :k]):
+            if neighbor < 0 or neighbor >= len(self.articles) or not score > 0:
+                continue
+            article = self.articles[neighbor]
+            results.append({'url': article['url'], 'title': article['title'], 'score': float(score)})
+        return results
+
+
+def index_version(index_dir=INDEX_DIR):
+    """Construction en service (None si l'index n'existe pas), pour invalider les caches"""
+    return current_build(index_dir)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Construire l\'index des articles similaires')
+    parser.add_argument('-r', '--rebuild', action='store_true', help='Reconstruire entièrement l\'index')
+    parser.add_argument('-d', '--index-dir', default=INDEX_DIR, help='Dossier de l\'index')
+    args = parser.parse_args()
+
+    client = pymongo.MongoClient('localhost', 27017)
+    collection = client['blogdumoderateur']['articles']
+
+    if args.rebuild:
+        count = build_index(collection, args.index_dir)
+        print(f"Index reconstruit: {count} articles")
+    else:
+        count = update_index(collection, args.index_dir)
+        print(f"Index mis à jour: {count} nouveaux articles")
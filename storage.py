@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Backends de stockage des articles scrapés.
+
+Le scraper enregistre les articles via un "sink" commun (StorageSink), qui détecte
+les doublons et regroupe les écritures par lots dans son propre format :
+    - MongoSink  : collection MongoDB "articles" (bulk_write ordonné)
+    - SQLiteSink : fichier SQLite en mode WAL (une transaction par lot)
+    - JsonlSink  : fichier JSON Lines en ajout seul
+
+Les backends fichiers permettent de scraper sans base de données puis de charger
+les résultats en une fois (l'index des articles similaires et le cube de tendances
+sont alors mis à jour avec les articles chargés) :
+    python storage.py load articles.jsonl            # JSON Lines -> MongoDB
+    python storage.py load articles.db --to jsonl -o export.jsonl
+"""
+
+import os
+import json
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+import pymongo
+import similar_articles
+import trends
+from read_api import bump_write_version
+
+logger = logging.getLogger(__name__)
+
+# Nombre d'écritures regroupées par lot
+BATCH_SIZE = 50
+
+
+def _encode(article):
+    """Sérialise un article en JSON (dates au format ISO)"""
+    return json.dumps(
+        article,
+        default=lambda obj: obj.isoformat() if isinstance(obj, datetime) else str(obj),
+        ensure_ascii=False
+    )
+
+
+def _decode(line):
+    """Désérialise un article JSON et restaure la date de scraping"""
+    article = json.loads(line)
+    if isinstance(article.get('scraped_at'), str):
+        article['scraped_at'] = datetime.fromisoformat(article['scraped_at'])
+    return article
+
+
+def _merge_labels(article, categories, favtags):
+    """
+    Ajoute des catégories/favtags à un article, comme s'ils avaient été relevés au scraping
+
+    Les tableaux sont initialisés depuis category/favtag des anciens articles, les
+    nouveaux favtags sont ajoutés aux tags et category/favtag vides sont renseignés.
+    """
+    for field, legacy_field, values in (('categories', 'category', categories), ('favtags', 'favtag', favtags)):
+        if field in article:
+            merged = list(article[field] or [])
+        else:
+            merged = [article[legacy_field]] if article.get(legacy_field) else []
+        merged.extend(value for value in values if value not in merged)
+        article[field] = merged
+        if not article.get(legacy_field) and merged:
+            article[legacy_field] = merged[0]
+
+    tags = list(article.get('tags') or [])
+    tags.extend(value for value in favtags if value not in tags)
+    article['tags'] = tags
+    return article
+
+
+def _add_to_labels(field, legacy_field, values):
+    """
+    Expression d'agrégation MongoDB ajoutant des valeurs à un tableau de labels
+
+    Équivalent ordonné de $addToSet, mais le tableau est d'abord initialisé à partir du
+    champ unique des anciens articles (category/favtag), pour ne pas le perdre.
+    """
+    if legacy_field:
+        existing = {"$ifNull": ["$" + field, {"$cond": [{"$gt": ["$" + legacy_field, None]}, ["$" + legacy_field], []]}]}
+    else:
+        existing = {"$ifNull": ["$" + field, []]}
+    return {"$concatArrays": [
+        existing,
+        {"$filter": {"input": values, "cond": {"$not": [{"$in": ["$$this", existing]}]}}}
+    ]}
+
+
+def _labels_update(categories, favtags):
+    """Pipeline de mise à jour MongoDB équivalent à _merge_labels"""
+    merged = {
+        "categories": _add_to_labels("categories", "category", categories),
+        "favtags": _add_to_labels("favtags", "favtag", favtags),
+        "tags": _add_to_labels("tags", None, favtags),
+    }
+    # Deuxième étape : category/favtag vides reçoivent le premier label fusionné
+    filled = {
+        legacy_field: {"$ifNull": ["$" + legacy_field, {"$ifNull": [{"$arrayElemAt": ["$" + field, 0]}, None]}]}
+        for field, legacy_field in (("categories", "category"), ("favtags", "favtag"))
+    }
+    return [{"$set": merged}, {"$set": filled}]
+
+
+class StorageSink(ABC):
+    """
+    Interface commune des backends de stockage
+
+    Les écritures (save, merge_labels) sont mises en lot et appliquées par flush,
+    automatiquement tous les batch_size articles. Les méthodes peuvent être appelées
+    depuis plusieurs threads : seul l'accès aux lots en attente est verrouillé, les
+    recherches de doublons (_exists) s'exécutent en parallèle des écritures.
+    """
+
+    name = None
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.lock = threading.Lock()  # Protège pending, pending_labels et writing
+        self.write_lock = threading.Lock()  # Applique les lots dans l'ordre
+        self.pending = {}  # URL -> article en attente d'écriture
+        self.pending_labels = []  # (URL, catégories, favtags) en attente d'écriture
+        self.writing = set()  # URLs des lots en cours d'écriture
+
+    def exists(self, url):
+        """Indique si un article est déjà enregistré (ou en attente d'écriture)"""
+        with self.lock:
+            if url in self.pending or url in self.writing:
+                return True
+        return self._exists(url)
+
+    def save(self, article):
+        """Enregistre un article (remplace l'article de même URL)"""
+        with self.lock:
+            self.pending[article['url']] = article
+            full = len(self.pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def merge_labels(self, url, categories, favtags):
+        """Ajoute des catégories/favtags à un article déjà enregistré"""
+        categories, favtags = self._new_labels(url, categories, favtags)
+        if not categories and not favtags:
+            return
+        with self.lock:
+            self.pending_labels.append((url, list(categories), list(favtags)))
+            full = len(self.pending_labels) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Applique les écritures en attente"""
+        with self.write_lock:
+            with self.lock:
+                articles = list(self.pending.values())
+                labels = self.pending_labels
+                urls = set(self.pending)
+                self.pending = {}
+                self.pending_labels = []
+                self.writing |= urls
+            try:
+                if articles or labels:
+                    self._write(articles, labels)
+            finally:
+                with self.lock:
+                    self.writing -= urls
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _new_labels(self, url, categories, favtags):
+        """Catégories/favtags à écrire pour un article (par défaut tous : le backend ignore les doublons)"""
+        return list(categories), list(favtags)
+
+    # Méthodes à implémenter par chaque backend
+    @abstractmethod
+    def _exists(self, url):
+        """Indique si un article est enregistré dans le backend"""
+
+    @abstractmethod
+    def _write(self, articles, labels):
+        """Écrit un lot d'articles puis de catégories/favtags ajoutés"""
+
+    @abstractmethod
+    def count(self):
+        """Nombre d'articles enregistrés"""
+
+    @abstractmethod
+    def iter_articles(self):
+        """Parcourt tous les articles enregistrés"""
+
+
+class MongoSink(StorageSink):
+    """Stockage dans la collection MongoDB "articles" """
+
+    name = 'mongo'
+
+    def __init__(self, host='localhost', port=27017, batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.client = pymongo.MongoClient(host, port)
+        self.db = self.client['blogdumoderateur']
+        self.collection = self.db['articles']
+        # Index unique : _exists et les upserts par URL ne parcourent pas toute la collection
+        self.collection.create_index("url", unique=True)
+
+    def _exists(self, url):
+        return self.collection.find_one({"url": url}, {"_id": 1}) is not None
+
+    def _write(self, articles, labels):
+        # Ordonné : les catégories ajoutées s'appliquent après l'enregistrement de l'article
+        operations = [pymongo.UpdateOne({"url": article['url']}, {"$set": article}, upsert=True) for article in articles]
+        operations.extend(
+            pymongo.UpdateOne({"url": url}, _labels_update(categories, favtags))
+            for url, categories, favtags in labels
+        )
+        result = self.collection.bulk_write(operations, ordered=True)
+        logger.info(f"Lot MongoDB: {result.upserted_count} nouveaux articles, {result.modified_count} mis à jour")
+
+        # Articles existants réécrits ou complétés : à recompter dans le cube de tendances
+        trends.mark_dirty(self.db, [
+            article['url'] for index, article in enumerate(articles) if index not in result.upserted_ids
+        ] + [url for url, categories, favtags in labels])
+
+        # Invalider le cache du service de lecture
+        if result.upserted_count or result.modified_count:
+            bump_write_version(self.db)
+
+    def count(self):
+        return self.collection.count_documents({})
+
+    def iter_articles(self):
+        for article in self.collection.find({}, {"_id": 0}):
+            yield article
+
+    def close(self):
+        super().close()
+        self.client.close()
+
+
+class SQLiteSink(StorageSink):
+    """
+    Stockage dans un fichier SQLite (mode WAL, une transaction par lot)
+
+    La connexion est partagée par tous les threads : chaque accès est verrouillé.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path='articles.db', batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.path = path
+        self.connection_lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS articles (url TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        self.connection.commit()
+
+    def _exists(self, url):
+        with self.connection_lock:
+            return self.connection.execute("SELECT 1 FROM articles WHERE url = ?", (url,)).fetchone() is not None
+
+    def _write(self, articles, labels):
+        with self.connection_lock, self.connection:
+            self.connection.executemany(
+                "INSERT INTO articles (url, data) VALUES (?, ?) ON CONFLICT(url) DO UPDATE SET data = excluded.data",
+                [(article['url'], _encode(article)) for article in articles]
+            )
+            for url, categories, favtags in labels:
+                row = self.connection.execute("SELECT data FROM articles WHERE url = ?", (url,)).fetchone()
+                if row:
+                    article = _decode(row[0])
+                    data = _encode(_merge_labels(article, categories, favtags))
+                    if data != row[0]:
+                        self.connection.execute("UPDATE articles SET data = ? WHERE url = ?", (data, url))
+        logger.info(f"Lot SQLite: {len(articles)} articles enregistrés dans {self.path}")
+
+    def count(self):
+        with self.connection_lock:
+            return self.connection.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def iter_articles(self):
+        # Lecture par pages, sans garder la connexion verrouillée entre deux articles
+        last_rowid = 0
+        while True:
+            with self.connection_lock:
+                rows = self.connection.execute(
+                    "SELECT rowid, data FROM articles WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (last_rowid, BATCH_SIZE)
+                ).fetchall()
+            if not rows:
+                break
+            for last_rowid, data in rows:
+                yield _decode(data)
+
+    def close(self):
+        super().close()
+        self.connection.close()
+
+
+class JsonlSink(StorageSink):
+    """
+    Stockage dans un fichier JSON Lines en ajout seul
+
+    Chaque article est une ligne ; les catégories/favtags ajoutés après coup sont des
+    lignes {"_labels": true, ...} fusionnées à la lecture. Les URLs déjà présentes
+    dans le fichier sont relues à l'ouverture (empreintes de 8 octets), avec leurs
+    catégories/favtags connus : une ligne de labels n'est écrite que si elle ajoute
+    quelque chose.
+    """
+
+    name = 'jsonl'
+
+    def __init__(self, path='articles.jsonl', batch_size=BATCH_SIZE):
+        super().__init__(batch_size)
+        self.path = path
+        self.seen = set()
+        self.articles_count = 0
+        self.labels = {}  # Empreinte d'URL -> (catégories, favtags) connus
+        self.labels_lock = threading.Lock()
+
+        if os.path.exists(path):
+            for record in self._read_records(path, repair=True):
+                key = self._key(record['url'])
+                if not record.get('_labels') and key not in self.seen:
+                    self.seen.add(key)
+                    self.articles_count += 1
+                self._new_labels(record['url'], record.get('categories') or [], record.get('favtags') or [])
+        self.file = open(path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def _read_records(path, repair=False):
+        """
+        Lit les enregistrements du fichier en ignorant les lignes illisibles
+
+        Une dernière ligne tronquée (interruption pendant une écriture) est retirée
+        du fichier si repair est vrai, pour que les ajouts suivants repartent d'une
+        ligne propre.
+        """
+        truncate_at = None
+        missing_newline = False
+        with open(path, 'rb') as f:
+            offset = 0
+            for number, line in enumerate(f, 1):
+                try:
+                    record = _decode(line)
+                    missing_newline = not line.endswith(b'\n')
+                    yield record
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    if line.endswith(b'\n'):
+                        logger.warning(f"{path}: ligne {number} illisible ignorée")
+                    else:
+                        logger.warning(f"{path}: dernière ligne {number} tronquée ignorée")
+                        truncate_at = offset
+                offset += len(line)
+
+        if repair and truncate_at is not None:
+            os.truncate(path, truncate_at)
+            logger.warning(f"{path}: dernière ligne tronquée supprimée du fichier")
+        elif repair and missing_newline:
+            with open(path, 'ab') as f:
+                f.write(b'\n')
+
+    @staticmethod
+    def _key(url):
+        return hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+
+    def _new_labels(self, url, categories, favtags):
+        """Retient les catégories/favtags d'un article et retourne ceux qui n'étaient pas connus"""
+        key = self._key(url)
+        with self.labels_lock:
+            known_categories, known_favtags = self.labels.get(key, ((), ()))
+            new_categories = [value for value in dict.fromkeys(categories) if value not in known_categories]
+            new_favtags = [value for value in dict.fromkeys(favtags) if value not in known_favtags]
+            if new_categories or new_favtags:
+                self.labels[key] = (known_categories + tuple(new_categories), known_favtags + tuple(new_favtags))
+        return new_categories, new_favtags
+
+    def save(self, article):
+        self._new_labels(article['url'], article.get('categories') or [], article.get('favtags') or [])
+        super().save(article)
+
+    def _exists(self, url):
+        return self._key(url) in self.seen
+
+    def _write(self, articles, labels):
+        lines = [_encode(article) for article in articles]
+        lines.extend(
+            _encode({'_labels': True, 'url': url, 'categories': categories, 'favtags': favtags})
+            for url, categories, favtags in labels
+        )
+        self.file.write(''.join(line + '\n' for line in lines))
+        self.file.flush()
+
+        for article in articles:
+            key = self._key(article['url'])
+            if key not in self.seen:
+                self.seen.add(key)
+                self.articles_count += 1
+        logger.info(f"Lot JSON Lines: {len(articles)} articles ajoutés à {self.path}")
+
+    def count(self):
+        return self.articles_count
+
+    def iter_articles(self):
+        self.flush()
+
+        # Première passe : catégories/favtags ajoutés après coup
+        labels = {}
+        for record in self._read_records(self.path):
+            if record.get('_labels'):
+                merged = labels.setdefault(record['url'], ([], []))
+                merged[0].extend(record['categories'])
+                merged[1].extend(record['favtags'])
+
+        # Deuxième passe : articles, la dernière version d'une URL l'emporte à l'import
+        for article in self._read_records(self.path):
+            if article.get('_labels'):
+                continue
+            if article['url'] in labels:
+                _merge_labels(article, *labels[article['url']])
+            yield article
+
+    def close(self):
+        super().close()
+        self.file.close()
+
+
+SINKS = {
+    'mongo': MongoSink,
+    'sqlite': SQLiteSink,
+    'jsonl': JsonlSink,
+}
+
+
+def open_sink(kind='mongo', path=None, batch_size=BATCH_SIZE):
+    """
+    Ouvre un backend de stockage
+
+    Args:
+        kind (str): 'mongo', 'sqlite' ou 'jsonl'
+        path (str): Fichier de sortie des backends fichiers
+        batch_size (int): Nombre d'écritures regroupées par lot
+    """
+    if kind not in SINKS:
+        raise ValueError(f"Backend de stockage inconnu: {kind} (choix: {', '.join(SINKS)})")
+    if kind == 'mongo':
+        return MongoSink(batch_size=batch_size)
+    if path:
+        return SINKS[kind](path, batch_size=batch_size)
+    return SINKS[kind](batch_size=batch_size)
+
+
+def guess_kind(path):
+    """Déduit le backend d'un fichier à partir de son extension"""
+    return 'jsonl' if path.endswith(('.jsonl', '.json')) else 'sqlite'
+
+
+def copy_articles(source, destination):
+    """
+    Copie tous les articles d'un backend vers un autre, par lots
+
+    Returns:
+        int: Nombre d'articles copiés
+    """
+    copied = 0
+    for article in source.iter_articles():
+        destination.save(article)
+        copied += 1
+    destination.flush()
+    return copied
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Charger des articles scrapés d\'un backend de stockage vers un autre')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    load_parser = subparsers.add_parser('load', help='Charger un fichier SQLite ou JSON Lines')
+    load_parser.add_argument('source', help='Fichier à charger (.db ou .jsonl)')
+    load_parser.add_argument('--to', choices=list(SINKS), default='mongo', help='Backend de destination (par défaut: mongo)')
+    load_parser.add_argument('-o', '--output', help='Fichier de destination (backends sqlite/jsonl)')
+    load_parser.add_argument('-b', '--batch-size', type=int, default=1000, help='Taille des lots (par défaut: 1000)')
+    args = parser.parse_args()
+
+    with open_sink(guess_kind(args.source), args.source) as source, \
+            open_sink(args.to, args.output, batch_size=args.batch_size) as destination:
+        count = copy_articles(source, destination)
+        print(f"{count} articles chargés depuis {args.source} vers {args.to}")
+        
+        # Ajouter les articles chargés à l'index des articles similaires et au cube de tendances
+        if count and isinstance(destination, MongoSink):
+            print(f"Index des articles similaires: {similar_articles.update_index(destination.collection)} articles ajoutés")
+            print(f"Cube de tendances: {trends.update_cube(destination.collection)} articles ajoutés ou recomptés")
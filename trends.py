@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cube de tendances précalculé du Blog du Modérateur.
+
+Le cube compte les articles par (semaine, catégorie, tag, auteur), à partir de
+publication_date, categories, tags et author. Il est calculé par des group-by
+vectorisés pandas et enregistré sous forme de tableaux NumPy compacts (codes
+entiers + libellés), de sorte qu'une courbe de tendance sur toute l'archive se
+réduit à un filtre et une somme sur quelques milliers de lignes.
+
+Un article pouvant avoir plusieurs catégories et plusieurs tags, le cube contient
+aussi les agrégats "toutes catégories" et "tous tags" (valeur ALL) : sommer les
+lignes de plusieurs tags compterait plusieurs fois le même article.
+
+Usage:
+    python trends.py            # Mise à jour incrémentale (nouveaux articles et articles modifiés)
+    python trends.py --rebuild  # Reconstruction complète du cube
+"""
+
+import os
+import hashlib
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+import pymongo
+
+logger = logging.getLogger(__name__)
+
+CUBE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'trends_cube.npz')
+
+# Valeur des agrégats "toutes catégories" / "tous tags"
+ALL = '*'
+UNKNOWN_AUTHOR = 'Auteur inconnu'
+
+DIMENSIONS = ['category', 'tag', 'author']
+
+# Nombre d'URLs par requête $in lors des mises à jour
+FETCH_BATCH_SIZE = 1000
+
+# Articles modifiés après coup (catégories/favtags ajoutés), à recompter
+DIRTY_COLLECTION = 'trends_dirty'
+
+# Séparateur des listes de labels dans l'instantané des articles comptés
+LABEL_SEPARATOR = '\x1f'
+
+
+def _url_hashes(urls):
+    """Empreintes 64 bits des URLs comptées, pour ne jamais compter un article deux fois"""
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest(), 'little') for url in urls],
+        dtype=np.uint64
+    )
+
+
+def mark_dirty(db, urls):
+    """
+    Signale des articles modifiés après leur écriture, pour que la prochaine mise à
+    jour du cube retire leur ancienne contribution et les recompte
+    """
+    if urls:
+        db[DIRTY_COLLECTION].insert_many([{'url': url} for url in urls], ordered=False)
+
+
+def _fetch_dirty(collection):
+    """Identifiants et URLs des articles signalés par mark_dirty"""
+    marks = list(collection.database[DIRTY_COLLECTION].find({}, {'url': 1}))
+    return [mark['_id'] for mark in marks], list(dict.fromkeys(mark['url'] for mark in marks))
+
+
+def _clear_dirty(collection, ids):
+    """Retire les signalements traités (pas ceux ajoutés entre-temps)"""
+    for start in range(0, len(ids), FETCH_BATCH_SIZE):
+        collection.database[DIRTY_COLLECTION].delete_many({'_id': {'$in': ids[start:start + FETCH_BATCH_SIZE]}})
+
+
+def _fetch_articles(collection, query=None):
+    """Récupère les champs utiles au cube"""
+    projection = {'_id': 0, 'url': 1, 'publication_date': 1, 'category': 1, 'categories': 1,
+                  'tags': 1, 'author': 1}
+    return list(collection.find(query or {}, projection))
+
+
+def _fetch_new_articles(collection, url_hashes, dirty_urls=()):
+    """
+    Récupère les articles dont l'URL n'est pas encore comptée, et ceux à recompter
+
+    La sélection se fait sur les URLs et non sur la date de scraping, pour inclure
+    les articles chargés après coup avec une date plus ancienne (storage.py load).
+    """
+    urls = [doc['url'] for doc in collection.find({}, {'_id': 0, 'url': 1})]
+    known = np.isin(_url_hashes(urls), url_hashes) if urls else []
+    new_urls = list(dict.fromkeys([url for url, is_known in zip(urls, known) if not is_known] + list(dirty_urls)))
+
+    docs = []
+    for start in range(0, len(new_urls), FETCH_BATCH_SIZE):
+        docs.extend(_fetch_articles(collection, {'url': {'$in': new_urls[start:start + FETCH_BATCH_SIZE]}}))
+    return docs
+
+
+def _article_labels(docs):
+    """
+    Semaine, catégories, tags et auteur de chaque article daté
+
+    Args:
+        docs (list): Articles issus de MongoDB
+
+    Returns:
+        pandas.DataFrame: Colonnes url_hash, week, category (liste), tag (liste), author.
+        Les articles sans date de publication valide sont ignorés.
+    """
+    columns = ['url_hash', 'week'] + DIMENSIONS
+    if not docs:
+        return pd.DataFrame(columns=columns)
+
+    df = pd.DataFrame(docs, columns=['url', 'publication_date', 'category', 'categories', 'tags', 'author'])
+
+    # Semaine de publication (lundi), les articles sans date sont ignorés
+    dates = pd.to_datetime(df['publication_date'], format='%Y-%m-%d', errors='coerce')
+    df = df[dates.notna()].copy()
+    dates = dates[dates.notna()]
+    df['week'] = (dates - pd.to_timedelta(dates.dt.dayofweek, unit='D')).dt.normalize()
+    df['url_hash'] = _url_hashes(df['url'])
+
+    # Toutes les catégories de l'article (anciens articles : champ "category" seul)
+    df['category'] = [
+        list(dict.fromkeys(cats if isinstance(cats, list) and cats else [cat] if isinstance(cat, str) else []))
+        for cats, cat in zip(df['categories'], df['category'])
+    ]
+    df['tag'] = [list(dict.fromkeys(tags if isinstance(tags, list) else [])) for tags in df['tags']]
+    df['author'] = df['author'].fillna(UNKNOWN_AUTHOR)
+    return df[columns].reset_index(drop=True)
+
+
+def _count(articles):
+    """Compte les articles de _article_labels par (semaine, catégorie, tag, auteur), agrégats ALL compris"""
+    columns = ['week'] + DIMENSIONS + ['count']
+    if not len(articles):
+        return pd.DataFrame(columns=columns)
+
+    df = articles[['week', 'category', 'tag', 'author']].copy()
+    df['category'] = [list(dict.fromkeys(list(cats) + [ALL])) for cats in df['category']]
+    df['tag'] = [list(dict.fromkeys(list(tags) + [ALL])) for tags in df['tag']]
+
+    exploded = df.explode('category').explode('tag')
+    counts = exploded.groupby(['week'] + DIMENSIONS, sort=False).size().rename('count').reset_index()
+    return counts[columns]
+
+
+def count_articles(docs):
+    """
+    Compte les articles par (semaine, catégorie, tag, auteur)
+
+    Args:
+        docs (list): Articles issus de MongoDB
+
+    Returns:
+        pandas.DataFrame: Colonnes week, category, tag, author, count
+    """
+    return _count(_article_labels(docs))
+
+
+def _merge(cubes):
+    """Additionne plusieurs cubes de comptes (les comptes négatifs retirent des articles)"""
+    cubes = [cube for cube in cubes if len(cube)]
+    if not cubes:
+        return pd.DataFrame(columns=['week'] + DIMENSIONS + ['count'])
+    merged = pd.concat(cubes, ignore_index=True)
+    merged = merged.groupby(['week'] + DIMENSIONS, sort=True)['count'].sum().reset_index()
+    return merged[merged['count'] != 0].reset_index(drop=True)
+
+
+def save_cube(cube, articles, path=CUBE_FILE):
+    """
+    Enregistre le cube et l'instantané des articles comptés sous forme de codes entiers et de libellés
+
+    L'instantané (catégories, tags, auteur et semaine de chaque article au moment du
+    comptage) permet de retirer la contribution d'un article avant de le recompter.
+    """
+    arrays = {
+        'week': cube['week'].to_numpy(dtype='datetime64[D]'),
+        'count': cube['count'].to_numpy(dtype=np.int32),
+        'url_hashes': articles['url_hash'].to_numpy(dtype=np.uint64),
+        'article_week': articles['week'].to_numpy(dtype='datetime64[D]'),
+    }
+    for dimension in DIMENSIONS:
+        codes, labels = pd.factorize(cube[dimension].astype(str))
+        arrays[f'{dimension}_codes'] = codes.astype(np.int32)
+        arrays[f'{dimension}_labels'] = np.asarray(labels, dtype=str)
+
+        values = articles[dimension]
+        if dimension != 'author':
+            values = values.map(LABEL_SEPARATOR.join)
+        codes, labels = pd.factorize(values.astype(str))
+        arrays[f'article_{dimension}_codes'] = codes.astype(np.int32)
+        arrays[f'article_{dimension}_labels'] = np.asarray(labels, dtype=str)
+
+    # Écriture dans un fichier temporaire puis remplacement, pour ne jamais exposer un cube partiel
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_cube(path=CUBE_FILE):
+    """
+    Charge le cube enregistré
+
+    Returns:
+        tuple: (DataFrame week/category/tag/author/count avec dimensions catégorielles,
+                instantané des articles comptés au format de _article_labels, ou None
+                pour un cube enregistré sans instantané)
+    """
+    with np.load(path) as data:
+        cube = pd.DataFrame({'week': pd.to_datetime(data['week']), 'count': data['count']})
+        for dimension in DIMENSIONS:
+            cube[dimension] = pd.Categorical.from_codes(data[f'{dimension}_codes'], data[f'{dimension}_labels'])
+        cube = cube[['week'] + DIMENSIONS + ['count']]
+
+        if 'article_week' not in data.files:
+            return cube, None
+        articles = pd.DataFrame({'url_hash': data['url_hashes'], 'week': pd.to_datetime(data['article_week'])})
+        for dimension in DIMENSIONS:
+            values = np.asarray(data[f'article_{dimension}_labels'], dtype=object)[data[f'article_{dimension}_codes']]
+            if dimension != 'author':
+                values = [value.split(LABEL_SEPARATOR) if value else [] for value in values]
+            articles[dimension] = values
+        return cube, articles
+
+
+def build_cube(collection, path=CUBE_FILE):
+    """
+    Construit le cube complet à partir de tous les articles de la collection
+
+    Returns:
+        int: Nombre d'articles comptés
+    """
+    dirty_ids, _ = _fetch_dirty(collection)
+    articles = _article_labels(_fetch_articles(collection))
+    save_cube(_count(articles), articles, path)
+    _clear_dirty(collection, dirty_ids)
+    logger.info(f"Cube de tendances construit: {len(articles)} articles")
+    return len(articles)
+
+
+def update_cube(collection, path=CUBE_FILE):
+    """
+    Ajoute au cube les articles de la collection qui n'y sont pas encore comptés
+
+    Les articles signalés par mark_dirty (catégories/favtags ajoutés après coup) sont
+    recomptés : leur contribution enregistrée est retirée avant d'ajouter la nouvelle.
+
+    Returns:
+        int: Nombre d'articles ajoutés ou recomptés
+    """
+    if not os.path.exists(path):
+        return build_cube(collection, path)
+
+    cube, articles = load_cube(path)
+    if articles is None:
+        logger.info("Cube de tendances sans instantané des articles: reconstruction complète")
+        return build_cube(collection, path)
+
+    # Signalements lus avant les articles : ceux ajoutés ensuite seront traités la prochaine fois
+    dirty_ids, dirty_urls = _fetch_dirty(collection)
+    counted = articles['url_hash'].to_numpy(dtype=np.uint64)
+    recounted = np.isin(counted, _url_hashes(dirty_urls)) if dirty_urls else np.zeros(len(articles), dtype=bool)
+    new_articles = _article_labels(_fetch_new_articles(collection, counted, dirty_urls))
+
+    if len(new_articles) or recounted.any():
+        removed = _count(articles[recounted])
+        removed['count'] = -removed['count']
+        cube = cube.astype({dimension: str for dimension in DIMENSIONS})
+        save_cube(
+            _merge([cube, removed, _count(new_articles)]),
+            pd.concat([articles[~recounted], new_articles], ignore_index=True),
+            path
+        )
+    _clear_dirty(collection, dirty_ids)
+
+    logger.info(f"Cube de tendances mis à jour: {len(new_articles)} articles ajoutés ou recomptés "
+                f"({int(recounted.sum())} retirés)")
+    return len(new_articles)
+
+
+def query_trend(cube, category=ALL, tag=ALL, author=None):
+    """
+    Nombre d'articles par semaine pour une catégorie, un tag et éventuellement un auteur
+
+    Args:
+        cube (DataFrame): Cube chargé par load_cube
+        category (str): Catégorie, ou ALL pour toutes
+        tag (str): Tag, ou ALL pour tous
+        author (str): Auteur, ou None pour tous
+
+    Returns:
+        pandas.Series: Nombre d'articles indexé par semaine
+    """
+    mask = (cube['category'] == category) & (cube['tag'] == tag)
+    if author:
+        mask &= cube['author'] == author
+    return cube.loc[mask].groupby('week')['count'].sum().sort_index()
+
+
+def cube_version(path=CUBE_FILE):
+    """Date de modification du cube (None s'il n'existe pas), pour invalider les caches"""
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    parser = argparse.ArgumentParser(description='Construire le cube de tendances des articles')
+    parser.add_argument('-r', '--rebuild', action='store_true', help='Reconstruire entièrement le cube')
+    parser.add_argument('-o', '--output', default=CUBE_FILE, help='Fichier du cube')
+    args = parser.parse_args()
+
+    client = pymongo.MongoClient('localhost', 27017)
+    collection = client['blogdumoderateur']['articles']
+
+    if args.rebuild:
+        count = build_cube(collection, args.output)
+        print(f"Cube reconstruit: {count} articles")
+    else:
+        count = update_cube(collection, args.output)
+        print(f"Cube mis à jour: {count} articles ajoutés ou recomptés")